@@ -1,15 +1,57 @@
+import asyncio
+import math
+import threading
 import pyaudio
 import numpy as np
 from scipy import signal
 
 
+class _StreamResampler:
+    """Polyphase FIR resampler that carries filter history across chunks.
+    
+    Resampling each chunk on its own restarts the filter from silence and
+    leaves a click at every chunk boundary. Keeping the tail of the previous
+    chunk (and the output phase) makes the stream resample as one signal.
+    """
+    
+    def __init__(self, up: int, down: int, taps: np.ndarray):
+        self.up = up
+        self.down = down
+        # float32 taps keep upfirdn in single precision with int16 input;
+        # up compensates for the zero-stuffing gain
+        self.taps = (taps * up).astype(np.float32)
+        self._history = np.zeros(0, dtype=np.int16)
+        self._phase = 0  # Upsampled position of the next output, relative to _history[0]
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample a chunk, continuing from where the previous chunk ended."""
+        x = np.concatenate((self._history, samples))
+        end = len(x) * self.up
+        count = max(0, -(-(end - self._phase) // self.down))
+        
+        # Delay the filter so upfirdn's output grid lines up with our phase
+        shift = -self._phase % self.down
+        taps = self.taps if shift == 0 else np.concatenate((np.zeros(shift, dtype=np.float32), self.taps))
+        first = (self._phase + shift) // self.down
+        out = signal.upfirdn(taps, x, self.up, self.down)[first:first + count]
+        
+        # Keep just enough input for the next output's filter span
+        next_phase = self._phase + count * self.down
+        keep_from = max(0, (next_phase - len(self.taps) + 1) // self.up)
+        self._history = x[keep_from:]
+        self._phase = next_phase - keep_from * self.up
+        return out
+
+
 class AudioStream:
     """Captures microphone audio and resamples to 16kHz/16-bit/mono PCM for Gemini Live API."""
     
     TARGET_RATE = 16000   # Gemini expects 16kHz
     CHANNELS = 1          # Mono
     FORMAT = pyaudio.paInt16  # 16-bit
-    CHUNK = 1024          # Samples per chunk at native rate
+    CHUNK = 1024          # Nominal samples per chunk; start() sets the instance value
+    PREFERRED_RATES = (16000, 48000, 44100)  # 16kHz first: no resampling needed
+    RING_CHUNKS = 64      # Ring buffer slots (~1.4s at 48kHz), power of two
     
     def __init__(self, device_index: int | None = None):
         """
@@ -23,6 +65,31 @@ class AudioStream:
         self.stream = None
         self.running = False
         self.native_rate = None
+        self._up = 1
+        self._down = 1
+        self._fir = None
+        self._resampler = None
+        self._needs_resample = False
+        self._chunk_out = 0   # 16kHz samples produced per chunk, set in start()
+        self._out = None      # int16 output buffer for a batch of chunks, reused
+        
+        # SPSC ring buffer of one-chunk slots: the PortAudio callback writes,
+        # read_chunk*() consumes. Indices count chunks and only ever grow; each
+        # is written by one side only. When the reader falls a full ring behind,
+        # the writer overwrites the oldest chunks and the reader skips them.
+        # Slots are sized in start() once the chunk size is known.
+        self._ring = None
+        self._ring_mask = self.RING_CHUNKS - 1
+        self._write_idx = 0
+        self._read_idx = 0
+        self.overruns = 0         # Chunks dropped because the reader fell behind
+        self.input_overflows = 0  # Callbacks where PortAudio itself dropped input
+        self._data_ready = threading.Event()  # Wakes blocking read_chunk()
+        self._chunk_event = None              # Wakes read_chunk_async(), bound on first use
+        self._loop = None
+        
+        # 3:1 decimating low-pass for the common 48kHz case (passband to ~6kHz)
+        self._fir_48k = signal.firwin(48, 7500, fs=48000, window=("kaiser", 6.0))
     
     def list_devices(self) -> list[dict]:
         """List available audio input devices."""
@@ -39,23 +106,37 @@ class AudioStream:
         return devices
     
     def start(self):
-        """Open the audio input stream at native rate."""
-        # Get native sample rate for the device
+        """Open the audio input stream, at 16kHz if the device supports it."""
         if self.device_index is not None:
+            # Use the first preferred rate the device declares, else its native rate
             info = self.pa.get_device_info_by_index(self.device_index)
             self.native_rate = int(info["defaultSampleRate"])
+            for rate in self.PREFERRED_RATES:
+                try:
+                    if self.pa.is_format_supported(
+                        rate,
+                        input_device=self.device_index,
+                        input_channels=self.CHANNELS,
+                        input_format=self.FORMAT
+                    ):
+                        self.native_rate = rate
+                        break
+                except ValueError:
+                    continue  # Rate not supported by this device
         else:
             # Default device - try common rates
-            for rate in [48000, 44100, 16000]:
+            for rate in self.PREFERRED_RATES:
                 try:
                     self.native_rate = rate
+                    self._init_resampler()
                     self.stream = self.pa.open(
                         format=self.FORMAT,
                         channels=self.CHANNELS,
                         rate=rate,
                         input=True,
                         input_device_index=self.device_index,
-                        frames_per_buffer=self.CHUNK
+                        frames_per_buffer=self.CHUNK,
+                        stream_callback=self._callback
                     )
                     self.running = True
                     print(f"🎤 Audio: Recording at {rate}Hz")
@@ -64,49 +145,171 @@ class AudioStream:
                     continue
             raise OSError("Could not open audio stream at any sample rate")
         
+        self._init_resampler()
         self.stream = self.pa.open(
             format=self.FORMAT,
             channels=self.CHANNELS,
             rate=self.native_rate,
             input=True,
             input_device_index=self.device_index,
-            frames_per_buffer=self.CHUNK
+            frames_per_buffer=self.CHUNK,
+            stream_callback=self._callback
         )
         self.running = True
         print(f"🎤 Audio: Recording at {self.native_rate}Hz (device {self.device_index})")
     
-    def read_chunk(self) -> bytes:
+    def _init_resampler(self):
+        """Compute polyphase up/down factors, chunk size and anti-aliasing FIR once."""
+        g = math.gcd(self.TARGET_RATE, self.native_rate)
+        self._up = self.TARGET_RATE // g
+        self._down = self.native_rate // g
+        
+        self.CHUNK = self._pick_chunk()
+        self._ring = np.zeros((self.RING_CHUNKS, self.CHUNK), dtype=np.int16)
+        self._write_idx = 0
+        self._read_idx = 0
+        
+        # CHUNK is a multiple of the decimation factor, so output length is fixed
+        self._chunk_out = self.CHUNK * self._up // self._down
+        self._out = None
+        
+        self._needs_resample = self.native_rate != self.TARGET_RATE
+        if not self._needs_resample:
+            # Already at 16kHz: chunks pass straight through
+            self._fir = None
+            self._resampler = None
+            return
+        elif self.native_rate == 48000:
+            # Fast path: short precomputed 3:1 decimator (up=1, down=3)
+            self._fir = self._fir_48k
+        else:
+            # Same low-pass resample_poly would design (44.1k->16k: up=160, down=441)
+            max_rate = max(self._up, self._down)
+            half_len = 10 * max_rate
+            self._fir = signal.firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", 5.0))
+        self._resampler = _StreamResampler(self._up, self._down, self._fir)
+    
+    def _pick_chunk(self) -> int:
+        """
+        Pick the chunk size nearest the nominal CHUNK for the current rate.
+        
+        The chunk is a multiple of the decimation factor, so every chunk
+        resamples to the same whole number of samples (48k: 1023 -> 341,
+        44.1k: 882 -> 320).
         """
-        Read a chunk of audio data, resampled to 16kHz for Gemini.
+        nominal = AudioStream.CHUNK
+        candidates = range(self._down, 2 * nominal + 1, self._down)
+        if not candidates:
+            return self._down
+        return min(candidates, key=lambda n: abs(n - nominal))
+    
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio callback: copy the captured buffer into the ring and wake readers."""
+        if status & pyaudio.paInputOverflow:
+            self.input_overflows += 1  # Samples lost before they reached this callback
+        # Never blocks: if the reader is a full ring behind this overwrites its oldest chunk
+        self._ring[self._write_idx & self._ring_mask] = np.frombuffer(in_data, dtype=np.int16)
+        self._write_idx += 1
+        
+        self._data_ready.set()
+        self._wake_async_reader()
+        return (None, pyaudio.paContinue)
+    
+    def _wake_async_reader(self):
+        """Set the asyncio event from any thread, if an async reader is attached."""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._chunk_event.set)
+    
+    def _chunk_available(self) -> bool:
+        """True once the callback has written a chunk past the read index."""
+        return self._write_idx > self._read_idx
+    
+    def _output_buffer(self, n_chunks: int) -> np.ndarray:
+        """Return the reusable int16 output buffer, grown to hold n_chunks."""
+        size = n_chunks * self._chunk_out
+        if self._out is None or len(self._out) < size:
+            self._out = np.empty(size, dtype=np.int16)
+        return self._out
+    
+    def _consume_chunk(self, out: np.ndarray):
+        """Take one chunk from the ring and write it, at 16kHz, into out."""
+        # Drop-oldest: if the writer has lapped us, skip past the overwritten
+        # chunks and leave one slot of slack before the next write
+        lag = self._write_idx - self._read_idx
+        if lag >= self.RING_CHUNKS:
+            skipped = lag - self.RING_CHUNKS + 1
+            self._read_idx += skipped
+            self.overruns += skipped
+        
+        samples = self._ring[self._read_idx & self._ring_mask]  # View, no copy
+        
+        if self._needs_resample:
+            # Polyphase resample, carrying filter state across chunk boundaries
+            resampled = self._resampler.process(samples)
+            
+            # Saturate in place, then round straight into the int16 output
+            # (filter overshoot past full scale would otherwise wrap into a click)
+            np.clip(resampled, -32768.0, 32767.0, out=resampled)
+            np.rint(resampled, out=out, casting="unsafe")
+        else:
+            out[:] = samples
+        
+        self._read_idx += 1
+    
+    def read_chunk(self, n_chunks: int = 1) -> bytes:
+        """
+        Read audio data, resampled to 16kHz for Gemini.
+        
+        Blocks the calling thread until the callback has captured enough chunks.
+        
+        Args:
+            n_chunks: Number of chunks to read and join into one buffer
         
         Returns:
             Raw PCM audio bytes at 16kHz
         """
-        if not self.stream or not self.running:
-            return b""
+        out = self._output_buffer(n_chunks)
+        per = self._chunk_out
+        for i in range(n_chunks):
+            while not self._chunk_available():
+                if not self.stream or not self.running:
+                    return out[:i * per].tobytes()
+                self._data_ready.clear()
+                if not self._chunk_available():
+                    self._data_ready.wait(timeout=0.5)
+            self._consume_chunk(out[i * per:(i + 1) * per])
+        return out[:n_chunks * per].tobytes()
+    
+    async def read_chunk_async(self, n_chunks: int = 1) -> bytes:
+        """
+        Await audio data, resampled to 16kHz for Gemini.
         
-        # Read at native rate
-        data = self.stream.read(self.CHUNK, exception_on_overflow=False)
+        Args:
+            n_chunks: Number of chunks to read and join into one buffer
         
-        # Resample to 16kHz if needed
-        if self.native_rate != self.TARGET_RATE:
-            # Convert bytes to numpy array
-            samples = np.frombuffer(data, dtype=np.int16)
-            
-            # Calculate resample ratio
-            num_samples = int(len(samples) * self.TARGET_RATE / self.native_rate)
-            
-            # Resample using scipy
-            resampled = signal.resample(samples, num_samples)
-            
-            # Convert back to int16 bytes
-            data = resampled.astype(np.int16).tobytes()
+        Returns:
+            Raw PCM audio bytes at 16kHz (short or empty once the stream is stopped)
+        """
+        if self._loop is None:
+            self._chunk_event = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
         
-        return data
+        out = self._output_buffer(n_chunks)
+        per = self._chunk_out
+        for i in range(n_chunks):
+            while not self._chunk_available():
+                if not self.stream or not self.running:
+                    return out[:i * per].tobytes()
+                self._chunk_event.clear()
+                if not self._chunk_available():
+                    await self._chunk_event.wait()
+            self._consume_chunk(out[i * per:(i + 1) * per])
+        return out[:n_chunks * per].tobytes()
     
     def stop(self):
         """Stop and close the audio stream."""
         self.running = False
+        self._wake_async_reader()  # Release a waiting reader
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
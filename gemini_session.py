@@ -69,16 +69,16 @@ class GeminiSession:
         self.session = await self._session_ctx.__aenter__()
         self.running = True
     
-    async def send_frame(self, base64_jpeg: str):
+    async def send_frame(self, jpeg: bytes):
         """
         Send a screen frame to Gemini.
         
         Args:
-            base64_jpeg: Base64-encoded JPEG image data
+            jpeg: Raw JPEG image bytes
         """
         if self.session and self.running:
             await self.session.send_realtime_input(
-                media=types.Blob(mime_type="image/jpeg", data=base64_jpeg)
+                media=types.Blob(mime_type="image/jpeg", data=jpeg)
             )
     
     async def send_audio(self, pcm_data: bytes):
@@ -95,29 +95,30 @@ class GeminiSession:
     
     async def listen_for_responses(self):
         """Listen for Gemini responses and pass to callback."""
+        on_response = self.on_response  # Hoisted out of the per-message loop
         try:
             async for response in self.session.receive():
-                # Handle different response types
-                text = None
-                
                 # Check for direct text
-                if hasattr(response, 'text') and response.text:
-                    text = response.text
+                text = getattr(response, 'text', None)
                 
-                # Check for server_content with model_turn parts
-                elif hasattr(response, 'server_content') and response.server_content:
-                    sc = response.server_content
-                    if hasattr(sc, 'model_turn') and sc.model_turn:
-                        for part in sc.model_turn.parts:
-                            if hasattr(part, 'text') and part.text:
-                                text = part.text
-                                break
-                    # Check for output_transcription
-                    if hasattr(sc, 'output_transcription') and sc.output_transcription:
-                        text = sc.output_transcription.text
+                if not text:
+                    sc = getattr(response, 'server_content', None)
+                    if sc:
+                        # output_transcription is the authoritative transcript for
+                        # audio responses, so model_turn parts are only a fallback
+                        transcription = getattr(sc, 'output_transcription', None)
+                        if transcription:
+                            text = transcription.text
+                        else:
+                            model_turn = getattr(sc, 'model_turn', None)
+                            if model_turn:
+                                for part in model_turn.parts or ():
+                                    text = getattr(part, 'text', None)
+                                    if text:
+                                        break
                 
                 if text:
-                    self.on_response(text)
+                    on_response(text)
                     print(f"💬 Gemini: {text}")
         except Exception as e:
             if self.running:  # Only log if not intentionally stopped
@@ -1,9 +1,13 @@
+import os
+import threading
 from datetime import datetime
 from pathlib import Path
 
 
 class FeedbackLogger:
-    """Logs timestamped feedback to file with immediate flush for crash protection."""
+    """Logs timestamped feedback to a line-buffered file, fsynced every few seconds for crash protection."""
+    
+    FSYNC_INTERVAL = 2.0  # Seconds between background fsyncs
     
     def __init__(self, session_name: str, output_dir: Path | None = None):
         """
@@ -20,15 +24,25 @@ class FeedbackLogger:
             output_dir = Path.cwd()
         
         self.filepath = output_dir / f"workshop_feedback_{safe_name}_{timestamp}.txt"
-        self.file = open(self.filepath, "w", encoding="utf-8")
+        self.file = open(self.filepath, "w", encoding="utf-8", buffering=1)
         self.response_count = 0
+        
+        # Line buffering hands each write to the OS; this thread fsyncs to disk
+        self._closed = threading.Event()
+        self._fsync_thread = threading.Thread(target=self._fsync_loop, daemon=True)
+        self._fsync_thread.start()
+        
         self._log(f"Session started: {session_name}")
     
+    def _fsync_loop(self):
+        """Periodically force written lines to disk until close()."""
+        while not self._closed.wait(self.FSYNC_INTERVAL):
+            os.fsync(self.file.fileno())
+    
     def _log(self, message: str):
-        """Write a timestamped line and flush immediately."""
+        """Write a timestamped line (line buffering flushes it to the OS)."""
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.file.write(f"[{timestamp}] {message}\n")
-        self.file.flush()
     
     def log_response(self, text: str):
         """
@@ -38,25 +52,44 @@ class FeedbackLogger:
             text: Response text from Gemini
         """
         self.response_count += 1
-        for line in text.strip().split("\n"):
-            if line.strip():  # Skip empty lines
-                self._log(line)
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        lines = [
+            f"[{timestamp}] {line}\n"
+            for line in text.strip().split("\n")
+            if line.strip()  # Skip empty lines
+        ]
+        if lines:
+            self.file.write("".join(lines))  # One write (and flush) per response
     
-    def log_stats(self, frames_sent: int, audio_seconds: float):
+    def log_stats(
+        self,
+        frames_sent: int,
+        audio_seconds: float,
+        audio_overruns: int = 0,
+        audio_input_overflows: int = 0
+    ):
         """
         Log session statistics.
         
         Args:
             frames_sent: Number of screen frames sent
             audio_seconds: Duration of audio captured in seconds
+            audio_overruns: Audio chunks dropped because sending fell behind capture
+            audio_input_overflows: PortAudio input overflows (samples lost by the driver)
         """
         self._log("--- SESSION STATS ---")
         self._log(f"Frames sent: {frames_sent}")
         self._log(f"Audio duration: {audio_seconds:.1f}s")
+        self._log(f"Audio chunks dropped: {audio_overruns}")
+        self._log(f"Audio input overflows: {audio_input_overflows}")
         self._log(f"Responses received: {self.response_count}")
     
     def close(self):
-        """Close the log file."""
+        """Stop the fsync thread, sync once more, and close the log file."""
+        self._closed.set()
+        self._fsync_thread.join()
+        self.file.flush()
+        os.fsync(self.file.fileno())
         self.file.close()
 
 
@@ -10,12 +10,21 @@ import asyncio
 import argparse
 import signal
 import sys
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+
+import numpy as np
 
 # Load .env BEFORE importing modules that need GOOGLE_API_KEY
 from dotenv import load_dotenv
 load_dotenv()
 
-from screen_capture import ScreenCapture
+from screen_capture import (
+    ScreenCapture, encode_jpeg, encode_shared_frame, frame_thumbnail, init_encode_worker
+)
 from audio_stream import AudioStream
 from gemini_session import GeminiSession
 from logger import FeedbackLogger
@@ -25,6 +34,9 @@ class WorkshopAttendee:
     """Orchestrates screen capture, audio streaming, and Gemini feedback."""
     
     FRAME_INTERVAL = 0.4  # ~2.5 fps
+    FRAME_CHANGE_LEVEL = 0.01   # Mean thumbnail brightness change for a frame to count as new
+    FRAME_REFRESH_INTERVAL = 10.0  # Resend an unchanged screen this often (seconds)
+    AUDIO_BATCH_SECONDS = 0.1  # Target audio duration per send
     
     def __init__(self, session_name: str, monitor: int, audio_device: int | None = None):
         """
@@ -42,73 +54,197 @@ class WorkshopAttendee:
         
         self.running = False
         self.frames_sent = 0
-        self.audio_chunks_sent = 0
+        self.frames_skipped = 0
+        self._last_thumb = None   # Thumbnail of the last frame sent
+        self._last_sent_at = 0.0
+        self.audio_bytes_sent = 0
+        
+        # Capture runs in its own thread; the queue holds at most 2 raw frames (with thumbnails)
+        self._frame_q = asyncio.Queue(maxsize=2)
+        self._capture_executor = ThreadPoolExecutor(max_workers=1)
+        self._loop = None
+        
+        # JPEG encode runs in a separate process so it doesn't hold our GIL;
+        # frames reach it through a shared memory segment rather than pickling
+        self._encode_pool = self._new_encode_pool()
+        self._frame_shm = None
+        self._audio_batch = 1     # Audio chunks per send, set once the mic is open
+        self._tasks = []
+        self._stop_requested = False  # Set by stop(), even before the tasks exist
+        self._stopped = False
     
     async def run(self):
         """Main run loop - streams screen and audio to Gemini."""
+        self._loop = asyncio.get_running_loop()
         await self.gemini.connect()
         self.audio.start()
+        # Chunk length depends on the rate the mic opened at (64ms at 16kHz, ~21ms at 48kHz)
+        self._audio_batch = max(1, round(
+            self.AUDIO_BATCH_SECONDS * self.audio.native_rate / self.audio.CHUNK
+        ))
         self.running = True
+        if self._stop_requested:
+            # Ctrl+C arrived during connect; stop() after this point cancels the tasks
+            await self.shutdown()
+            return
+        self._loop.run_in_executor(self._capture_executor, self._capture_worker)
         
         print(f"🎬 Session started. Streaming to Gemini...")
         print(f"📁 Logging to: {self.logger.filepath}")
         print("Press Ctrl+C to stop.\n")
         
-        # Run tasks concurrently
+        # Run tasks concurrently; stop() cancels them all at once
         try:
-            await asyncio.gather(
-                self._screen_loop(),
-                self._audio_loop(),
-                self.gemini.listen_for_responses(),
-            )
+            async with asyncio.TaskGroup() as tg:
+                self._tasks = [
+                    tg.create_task(self._screen_loop()),
+                    tg.create_task(self._audio_loop()),
+                    tg.create_task(self.gemini.listen_for_responses()),
+                ]
         except asyncio.CancelledError:
             pass  # Expected on shutdown
+        finally:
+            await self.shutdown()
+    
+    def stop(self):
+        """Request shutdown from any thread (e.g. a signal handler)."""
+        self._stop_requested = True
+        self.running = False
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._cancel_tasks)
+    
+    def _cancel_tasks(self):
+        """Cancel the streaming tasks, interrupting any pending sleep or read."""
+        for task in self._tasks:
+            task.cancel()
+    
+    def _capture_worker(self):
+        """Capture frames off the event loop (runs in the capture thread)."""
+        while self.running:
+            try:
+                frame = self.screen.grab_raw()
+                thumb = frame_thumbnail(frame)  # Off the event loop, like the grab
+                if not self.running:
+                    break  # Shutdown began during the grab; the loop may be closing
+                try:
+                    self._loop.call_soon_threadsafe(self._put_frame, frame, thumb)
+                except RuntimeError:
+                    break  # Event loop already closed
+                time.sleep(self.FRAME_INTERVAL)
+            except Exception as e:
+                print(f"Screen error: {e}")
+                time.sleep(1)  # Brief pause before retry
+    
+    def _put_frame(self, frame: np.ndarray, thumb: np.ndarray):
+        """Queue a frame and its thumbnail, dropping the oldest if the sender has fallen behind."""
+        if self._frame_q.full():
+            self._frame_q.get_nowait()
+        self._frame_q.put_nowait((frame, thumb))
+    
+    async def _encode_frame(self, frame: np.ndarray) -> bytes:
+        """Copy a raw frame into shared memory and JPEG-encode it in the encode process."""
+        if self._frame_shm is None or self._frame_shm.size < frame.nbytes:
+            self._release_frame_shm()
+            self._frame_shm = shared_memory.SharedMemory(create=True, size=frame.nbytes)
+        shared = np.ndarray(frame.shape, dtype=np.uint8, buffer=self._frame_shm.buf)
+        shared[...] = frame
+        del shared  # Drop our export of the buffer so it can be released later
+        
+        try:
+            return await self._loop.run_in_executor(
+                self._encode_pool, encode_shared_frame,
+                self._frame_shm.name, frame.shape, self.screen.JPEG_QUALITY
+            )
+        except BrokenProcessPool:
+            # Worker died: start a fresh one and encode this frame in-process
+            print("Encode worker died, restarting it")
+            self._encode_pool.shutdown(wait=False)
+            self._encode_pool = self._new_encode_pool()
+            return encode_jpeg(frame, self.screen.JPEG_QUALITY)
+    
+    @staticmethod
+    def _new_encode_pool() -> ProcessPoolExecutor:
+        """Create the single-worker JPEG encode process pool."""
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_encode_worker
+        )
+    
+    def _release_frame_shm(self):
+        """Close and unlink the shared frame buffer, if any."""
+        if self._frame_shm is not None:
+            self._frame_shm.close()
+            self._frame_shm.unlink()
+            self._frame_shm = None
     
     async def _screen_loop(self):
-        """Capture and send screen frames."""
+        """Encode and send captured screen frames, skipping unchanged ones."""
         while self.running:
+            frame, thumb = await self._frame_q.get()
             try:
-                frame = self.screen.capture_frame()
-                await self.gemini.send_frame(frame)
+                # Static slides are the common case: skip encode+send for frames
+                # that match the last one sent, but refresh Gemini periodically
+                now = time.monotonic()
+                if (self._last_thumb is not None
+                        and np.abs(thumb - self._last_thumb).mean() < self.FRAME_CHANGE_LEVEL
+                        and now - self._last_sent_at < self.FRAME_REFRESH_INTERVAL):
+                    self.frames_skipped += 1
+                    continue
+                
+                jpeg = await self._encode_frame(frame)
+                await self.gemini.send_frame(jpeg)
+                self._last_thumb = thumb
+                self._last_sent_at = now
                 self.frames_sent += 1
                 if self.frames_sent % 10 == 0:
                     print(f"📷 Frames sent: {self.frames_sent}", end="\r")
-                await asyncio.sleep(self.FRAME_INTERVAL)
             except Exception as e:
                 print(f"Screen error: {e}")
                 await asyncio.sleep(1)  # Brief pause before retry
     
     async def _audio_loop(self):
         """Capture and send audio chunks."""
-        loop = asyncio.get_event_loop()
         while self.running:
             try:
-                # Run blocking read in executor to avoid blocking the event loop
-                chunk = await loop.run_in_executor(None, self.audio.read_chunk)
+                # Awaits the PortAudio callback instead of blocking a worker thread;
+                # batching chunks cuts per-message websocket overhead
+                chunk = await self.audio.read_chunk_async(self._audio_batch)
                 if chunk:
                     await self.gemini.send_audio(chunk)
-                    self.audio_chunks_sent += 1
+                    self.audio_bytes_sent += len(chunk)
             except Exception as e:
                 print(f"Audio error: {e}")
                 await asyncio.sleep(0.1)
     
     async def shutdown(self):
         """Graceful shutdown with stats."""
+        if self._stopped:
+            return
+        self._stopped = True
         print("\n⏹️  Stopping session...")
         self.running = False
+        self._capture_executor.shutdown(wait=False)
+        self._encode_pool.shutdown(wait=True, cancel_futures=True)
+        self._release_frame_shm()
         
         self.audio.stop()
         await self.gemini.disconnect()
         
-        # Calculate audio duration: chunks * bytes_per_chunk / (sample_rate * bytes_per_sample)
-        audio_seconds = (self.audio_chunks_sent * AudioStream.CHUNK) / (AudioStream.RATE * 2)
+        # Calculate audio duration: bytes_sent / (sample_rate * bytes_per_sample)
+        audio_seconds = self.audio_bytes_sent / (AudioStream.RATE * 2)
         
-        self.logger.log_stats(self.frames_sent, audio_seconds)
+        self.logger.log_stats(
+            self.frames_sent, audio_seconds, self.audio.overruns, self.audio.input_overflows
+        )
         self.logger.close()
         
         print(f"\n✅ Session complete!")
-        print(f"   📷 Frames: {self.frames_sent}")
-        print(f"   🎤 Audio: {audio_seconds:.1f}s")
+        print(f"   📷 Frames: {self.frames_sent} ({self.frames_skipped} unchanged, skipped)")
+        print(
+            f"   🎤 Audio: {audio_seconds:.1f}s ({self.audio.overruns} chunks dropped, "
+            f"{self.audio.input_overflows} input overflows)"
+        )
         print(f"   📝 Log: {self.logger.filepath}")
 
 
@@ -154,7 +290,7 @@ def main():
     # Handle Ctrl+C gracefully
     def signal_handler(sig, frame):
         print("\nReceived interrupt signal...")
-        asyncio.get_event_loop().create_task(attendee.shutdown())
+        attendee.stop()
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
@@ -1,15 +1,119 @@
+import signal
 import pyscreenshot
-import base64
+import numpy as np
 from PIL import Image
 from io import BytesIO
+from multiprocessing import shared_memory
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGRX, TJPF_RGB, TJSAMP_420
+except ImportError:
+    TurboJPEG = None  # Fall back to Pillow's encoder
+
+
+# Per-process encoder state, so the encode functions also work in a pool worker
+_turbojpeg = None          # TurboJPEG handle (False if unavailable), created on first use
+_jpeg_buffer = BytesIO()   # Reused by the Pillow encoder across frames
+_frame_shm = None          # Worker-side attachment to the parent's shared frame buffer
+
+
+def _get_turbojpeg():
+    """Return this process's libjpeg-turbo encoder, or None if it is missing."""
+    global _turbojpeg
+    if _turbojpeg is None:
+        _turbojpeg = False
+        if TurboJPEG is not None:
+            try:
+                _turbojpeg = TurboJPEG()
+            except Exception:
+                pass
+    return _turbojpeg or None
+
+
+def encode_jpeg(frame: np.ndarray, quality: int) -> bytes:
+    """
+    Encode a frame to JPEG.
+    
+    Args:
+        frame: uint8 array of shape (height, width, 3) in RGB order, or
+            (height, width, 4) in BGRX order as captured by mss
+        quality: JPEG quality (1-100)
+    
+    Returns:
+        JPEG bytes
+    """
+    bgrx = frame.shape[2] == 4
+    tj = _get_turbojpeg()
+    if tj is not None:
+        # libjpeg-turbo converts BGRX during its own colour conversion pass
+        return tj.encode(
+            frame,
+            quality=quality,
+            pixel_format=TJPF_BGRX if bgrx else TJPF_RGB,
+            jpeg_subsample=TJSAMP_420
+        )
+    height, width = frame.shape[:2]
+    if bgrx:
+        img = Image.frombuffer("RGB", (width, height), frame, "raw", "BGRX", 0, 1)
+    else:
+        img = Image.fromarray(frame)
+    _jpeg_buffer.seek(0)
+    _jpeg_buffer.truncate()
+    img.save(_jpeg_buffer, format="JPEG", quality=quality)
+    return _jpeg_buffer.getvalue()
+
+
+def init_encode_worker():
+    """Process-pool initializer: leave Ctrl+C to the parent, which shuts the pool down."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def encode_shared_frame(shm_name: str, shape: tuple[int, int, int], quality: int) -> bytes:
+    """
+    Process-pool entry point: encode a frame the parent wrote into shared memory.
+    
+    Passing the segment name instead of the pixels avoids pickling ~2.7MB per frame.
+    """
+    global _frame_shm
+    if _frame_shm is None or _frame_shm.name != shm_name:
+        if _frame_shm is not None:
+            _frame_shm.close()
+        _frame_shm = shared_memory.SharedMemory(name=shm_name)
+    frame = np.ndarray(shape, dtype=np.uint8, buffer=_frame_shm.buf)
+    return encode_jpeg(frame, quality)
+
+
+def frame_thumbnail(frame: np.ndarray) -> np.ndarray:
+    """
+    Area-averaged 160x90 grayscale thumbnail of a frame, for slide-change detection.
+    
+    Box filtering averages every pixel into its cell, so even a single added
+    line of text shifts the cells it crosses (point-sampling misses thin strokes).
+    
+    Args:
+        frame: uint8 array of shape (height, width, 3 or 4), as from grab_raw()
+    
+    Returns:
+        float32 array of shape (90, 160) with brightness 0-255
+    """
+    height, width = frame.shape[:2]
+    if frame.shape[2] == 4:
+        img = Image.frombuffer("RGB", (width, height), frame, "raw", "BGRX", 0, 1)
+    else:
+        img = Image.fromarray(frame)
+    thumb = img.resize((160, 90), Image.BOX).convert("L")
+    return np.asarray(thumb, dtype=np.float32)
 
 
 class ScreenCapture:
-    """Captures screen frames, resizes to 720p, encodes to base64 JPEG.
+    """Captures screen frames, resizes to 720p, encodes to JPEG.
     
-    Uses pyscreenshot for better Linux multi-monitor compatibility.
+    Grabs with mss directly; falls back to pyscreenshot for Linux
+    multi-monitor setups where mss capture fails.
     """
     
+    JPEG_QUALITY = 75
+    
     # Define monitor regions (left, top, right, bottom) - will be auto-detected
     _monitors = None
     
@@ -23,6 +127,10 @@ class ScreenCapture:
         """
         self.monitor_index = monitor_index
         self.max_height = max_height
+        self._sct = None      # mss handle, created lazily in the capturing thread
+        self._use_mss = True  # Cleared after the first failed mss grab
+        self._src_size = None  # Last captured size, and the resize target cached for it
+        self._new_size = None
         
         # Auto-detect monitors on first init
         if ScreenCapture._monitors is None:
@@ -56,40 +164,85 @@ class ScreenCapture:
             {"index": i+1, **m} for i, m in enumerate(ScreenCapture._monitors)
         ]
     
-    def capture_frame(self) -> str:
-        """
-        Capture frame, resize to max_height, return as base64 JPEG.
-        
-        Returns:
-            Base64-encoded JPEG string
-        """
+    def _target_size(self, size: tuple[int, int]) -> tuple[int, int] | None:
+        """Return the resized (width, height) for a source size, or None if it fits."""
+        width, height = size
+        if height <= self.max_height:
+            return None
+        ratio = self.max_height / height
+        return (int(width * ratio), self.max_height)
+    
+    def _grab_mss(self) -> Image.Image:
+        """Grab the selected monitor with mss, reusing one X connection."""
+        import mss
+        # mss handles are per-thread, so create it where capture runs
+        if self._sct is None:
+            self._sct = mss.mss()
+        try:
+            monitor = self._sct.monitors[self.monitor_index]
+        except IndexError:
+            monitor = self._sct.monitors[0]  # Fallback to full desktop
+        shot = self._sct.grab(monitor)
+        # Wrap the BGRA buffer without copying or converting. Pillow calls it
+        # RGBX, but only resize touches it and that is channel-order agnostic;
+        # the encoder is told the real BGRX order.
+        return Image.frombuffer("RGBX", shot.size, shot.raw, "raw", "RGBX", 0, 1)
+    
+    def _grab_pyscreenshot(self) -> Image.Image:
+        """Grab the selected monitor with pyscreenshot."""
         if self.monitor_index == 0 or not ScreenCapture._monitors:
             # Capture full desktop
-            img = pyscreenshot.grab()
+            return pyscreenshot.grab()
         else:
             # Capture specific monitor region
             try:
                 m = ScreenCapture._monitors[self.monitor_index - 1]
                 bbox = (m['left'], m['top'], m['right'], m['bottom'])
-                img = pyscreenshot.grab(bbox=bbox)
+                return pyscreenshot.grab(bbox=bbox)
             except IndexError:
                 # Fallback to full desktop
-                img = pyscreenshot.grab()
+                return pyscreenshot.grab()
+    
+    def grab_raw(self) -> np.ndarray:
+        """
+        Capture frame and resize to max_height, without encoding.
+        
+        Returns:
+            uint8 array: (height, width, 4) BGRX from mss, or
+            (height, width, 3) RGB from the pyscreenshot fallback
+        """
+        img = None
+        if self._use_mss:
+            try:
+                img = self._grab_mss()
+            except Exception as e:
+                # e.g. XGetImage() failed on mixed-DPI multi-monitor X11
+                print(f"mss capture failed ({e}), falling back to pyscreenshot")
+                self._use_mss = False
+        if img is None:
+            img = self._grab_pyscreenshot()
         
-        # Resize if height exceeds max
-        if img.height > self.max_height:
-            ratio = self.max_height / img.height
-            new_size = (int(img.width * ratio), self.max_height)
-            img = img.resize(new_size, Image.LANCZOS)
+        # Resize if height exceeds max (target size only changes with the source size)
+        if img.size != self._src_size:
+            self._src_size = img.size
+            self._new_size = self._target_size(img.size)
+        if self._new_size is not None:
+            img = img.resize(self._new_size, Image.BILINEAR)
         
-        # Convert RGBA to RGB (JPEG doesn't support alpha)
+        # Convert pyscreenshot's RGBA to RGB (JPEG doesn't support alpha)
         if img.mode == 'RGBA':
             img = img.convert('RGB')
         
-        # Encode to base64 JPEG
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG", quality=75)
-        return base64.b64encode(buffer.getvalue()).decode("utf-8")
+        return np.asarray(img)
+    
+    def capture_frame(self) -> bytes:
+        """
+        Capture frame, resize to max_height, return as JPEG.
+        
+        Returns:
+            JPEG bytes (the SDK base64-encodes Blob data on the wire)
+        """
+        return encode_jpeg(self.grab_raw(), self.JPEG_QUALITY)
 
 
 if __name__ == "__main__":
@@ -101,11 +254,11 @@ if __name__ == "__main__":
     
     print("\nCapturing full desktop (index 0)...")
     frame = sc.capture_frame()
-    print(f"Captured frame: {len(frame)} bytes (base64)")
+    print(f"Captured frame: {len(frame)} bytes (JPEG)")
     
     # Test individual monitors
     if len(sc.list_monitors()) > 1:
         print("\nTesting monitor 1...")
         sc.monitor_index = 1
         frame = sc.capture_frame()
-        print(f"Monitor 1 frame: {len(frame)} bytes (base64)")
+        print(f"Monitor 1 frame: {len(frame)} bytes (JPEG)")